@@ -1,16 +1,22 @@
 # app.py
 from flask import (
     Flask, render_template, request, redirect,
-    url_for, session, flash
+    url_for, session, flash, g, abort, make_response
 )
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from sqlalchemy import event, select, exists, func, case, distinct, and_, or_, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import selectinload, joinedload, raiseload, undefer
+from sqlalchemy.pool import QueuePool
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+import hashlib
 import os
 
 from models import (
     db, Student, Employer, Faculty,
-    JobPosition, Application, Selection,
-    CoopEligibility, CoopRecord, generate_id
+    JobPosition, Application,
+    CoopRecord, GRADES, RAISE_ON_LAZY_LOAD, normalize_email
 )
 
 # ---------- App and DB setup ----------
@@ -21,32 +27,143 @@ app = Flask(__name__)
 app.config["SECRET_KEY"] = "change-this-secret-key"
 app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(BASE_DIR, "coop_portal.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# Keep connections open between requests so connection setup, pragmas and
+# sqlite3's per-connection statement cache are reused. Pre-ping and recycle
+# keep a dropped or stale connection from failing the first query after idle.
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+    "poolclass": QueuePool,
+    "pool_size": 10,
+    "max_overflow": 20,
+    "pool_timeout": 30,
+    "pool_pre_ping": True,
+    "pool_recycle": 1800,
+    "connect_args": {"check_same_thread": False},
+}
+# Explicit work factor (~100-250 ms per check) instead of the library default
+app.config["PASSWORD_HASH_METHOD"] = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+
+PASSWORD_HASH_METHOD = app.config["PASSWORD_HASH_METHOD"]
+# Checked against when the login email is unknown, to keep timing uniform
+DUMMY_HASH = generate_password_hash("x" * 16, method=PASSWORD_HASH_METHOD)
 
 db.init_app(app)
 
+# Background workers for notifications, so SMTP never blocks a request
+email_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="email")
+
+def _set_sqlite_pragmas(dbapi_conn, _connection_record):
+    """
+    Tune every new SQLite connection: WAL lets readers run during a write,
+    synchronous=NORMAL is safe under WAL and fsyncs less, and the page
+    cache (~20 MB) and temp tables stay in memory.
+    """
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-20000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
 # Create tables once at startup (Flask 3 safe)
 with app.app_context():
+    if db.engine.dialect.name == "sqlite":
+        event.listen(db.engine, "connect", _set_sqlite_pragmas)
+    # Databases from before the integer surrogate keys have string primary
+    # keys and no display_id; create_all cannot migrate them in place
+    inspector = db.inspect(db.engine)
+    if inspector.has_table("students") and "display_id" not in {
+        col["name"] for col in inspector.get_columns("students")
+    }:
+        raise SystemExit(
+            "coop_portal.db uses the old string-key schema; "
+            "delete it and restart to recreate the database."
+        )
     db.create_all()
+    # Refresh planner statistics so SQLite makes use of the indexes
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
 
 
 # ---------- Helpers ----------
 
+# Session role -> model holding that kind of account
+ROLE_MODELS = {
+    "student": Student,
+    "employer": Employer,
+    "faculty": Faculty,
+}
+
+
 def current_user():
-    """Return (role, user_obj) for the logged-in user, or (None, None)."""
+    """
+    Return (role, user_obj) for the logged-in user, or (None, None).
+    The result is cached on `g`, so the lookup runs at most once per request.
+    """
+    if "cu" in g:
+        return g.cu
+
     role = session.get("role")
     user_id = session.get("user_id")
     if not role or not user_id:
-        return None, None
-
-    if role == "student":
-        user = Student.query.get(user_id)
-    elif role == "employer":
-        user = Employer.query.get(user_id)
-    elif role == "faculty":
-        user = Faculty.query.get(user_id)
-    else:
-        user = None
-    return role, user
+        g.cu = (None, None)
+        return g.cu
+
+    model = ROLE_MODELS.get(role)
+    user = model.get_cached(user_id) if model else None
+    g.cu = (role, user)
+    return g.cu
+
+
+@app.before_request
+def load_current_user():
+    """Resolve the logged-in user once, before the route runs."""
+    current_user()
+
+
+def require_role(role: str):
+    """
+    Route decorator: redirect to login unless the logged-in user has `role`.
+    The resolved user is passed to the view as the `user` keyword argument.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            current_role, user = current_user()
+            if current_role != role or user is None:
+                return redirect(url_for("login"))
+            return view(*args, user=user, **kwargs)
+        return wrapper
+    return decorator
+
+
+def debug_raiseload(*options):
+    """
+    Return `options` plus raiseload("*") when RAISE_ON_LAZY_LOAD is on
+    (`flask --debug`), so any relationship the query did not eager-load
+    raises instead of silently issuing one query per row.
+    """
+    if RAISE_ON_LAZY_LOAD:
+        return (*options, raiseload("*"))
+    return options
+
+
+def load_student_applications(student_id):
+    """
+    Return a student's applications (newest first) with everything the
+    student pages render already loaded: position, employer and co-op
+    record (eligibility is a column on the application itself).
+    """
+    return db.session.scalars(
+        select(Application)
+        .where(Application.student_id == student_id)
+        .options(*debug_raiseload(
+            selectinload(Application.position).selectinload(JobPosition.employer),
+            selectinload(Application.coop_record),
+        ))
+        # server timestamps have 1s resolution; id breaks ties in insert order
+        .order_by(Application.applied_at.desc(), Application.id.desc())
+    ).all()
 
 
 def check_eligibility(student: Student, position: JobPosition):
@@ -58,8 +175,8 @@ def check_eligibility(student: Student, position: JobPosition):
     - Whether they have enough semesters completed (very simplified)
     """
 
-    # Student must have at least a 2.0 GPA
-    gpa_ok = student.gpa is not None and student.gpa >= 2.0
+    # Student must have at least a 2.0 GPA (an integer compare on hundredths)
+    gpa_ok = student.gpa_x100 is not None and student.gpa_x100 >= 200
 
     # Internship must run for at least 7 weeks
     weeks_ok = position.weeks is not None and position.weeks >= 7
@@ -103,6 +220,45 @@ def send_email(to_email: str, subject: str, body: str):
     print("================================")
 
 
+def _log_email_failure(future):
+    """Done-callback for queued emails: a worker exception would otherwise vanish."""
+    exc = future.exception()
+    if exc is not None:
+        app.logger.error("Sending queued email failed", exc_info=(type(exc), exc, exc.__traceback__))
+
+
+def queue_email(to_email: str, subject: str, body: str):
+    """Send an email on a background worker and return immediately."""
+    future = email_executor.submit(send_email, to_email, subject, body)
+    future.add_done_callback(_log_email_failure)
+
+
+# Rendered HTML + ETag for pages that look the same to every anonymous visitor
+_static_pages = {}
+
+
+def render_static_page(template_name: str):
+    """
+    Render a page that only varies with flash messages and the logged-in
+    nav bar. Anonymous visitors with no pending flashes get a cached copy
+    with an ETag, so a revalidating browser receives a bodiless 304.
+    """
+    if "_flashes" in session or session.get("role"):
+        return render_template(template_name)
+
+    page = _static_pages.get(template_name)
+    if page is None:
+        html = render_template(template_name)
+        page = _static_pages[template_name] = (html, hashlib.md5(html.encode()).hexdigest())
+
+    html, etag = page
+    response = make_response(html)
+    response.set_etag(etag)
+    # no-cache: always revalidate, so pending flash messages are never hidden
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
 # ---------- Auth Routes ----------
 
 @app.route("/")
@@ -122,18 +278,17 @@ def index():
 def login():
     if request.method == "POST":
         role = request.form.get("role")  # student/employer/faculty
-        email = request.form.get("email")
-        password = request.form.get("password")
+        email = normalize_email(request.form.get("email"))
+        password = request.form.get("password", "")
 
+        model = ROLE_MODELS.get(role)
         user = None
-        if role == "student":
-            user = Student.query.filter_by(email=email).first()
-        elif role == "employer":
-            user = Employer.query.filter_by(email=email).first()
-        elif role == "faculty":
-            user = Faculty.query.filter_by(email=email).first()
+        if model:
+            user = model.query.options(undefer(model.password_hash)).filter_by(email=email).first()
 
-        if user and check_password_hash(user.password_hash, password):
+        # Always run one hash check so a missing account takes as long as a wrong password
+        valid = check_password_hash(user.password_hash if user else DUMMY_HASH, password)
+        if user and valid:
             session["role"] = role
             session["user_id"] = user.id
             flash("Logged in successfully.", "success")
@@ -141,7 +296,7 @@ def login():
         else:
             flash("Invalid credentials.", "danger")
 
-    return render_template("login.html")
+    return render_static_page("login.html")
 
 
 @app.route("/logout")
@@ -157,7 +312,7 @@ def logout():
 def register_student():
     if request.method == "POST":
         name = request.form.get("name")
-        email = request.form.get("email")
+        email = normalize_email(request.form.get("email"))
         phone = request.form.get("phone")
         department = request.form.get("department")
         major = request.form.get("major")
@@ -172,9 +327,7 @@ def register_student():
             flash("Email already registered.", "danger")
             return redirect(url_for("register_student"))
 
-        student_id = generate_id("STU", Student)
         student = Student(
-            id=student_id,
             name=name,
             email=email,
             phone=phone,
@@ -185,14 +338,14 @@ def register_student():
             start_semester=start_semester,
             start_year=start_year,
             is_transfer=is_transfer,
-            password_hash=generate_password_hash(password)
+            password_hash=generate_password_hash(password, method=PASSWORD_HASH_METHOD)
         )
         db.session.add(student)
         db.session.commit()
         flash("Student registered. You can now log in.", "success")
         return redirect(url_for("login"))
 
-    return render_template("register_student.html")
+    return render_static_page("register_student.html")
 
 
 @app.route("/register/employer", methods=["GET", "POST"])
@@ -200,7 +353,7 @@ def register_employer():
     if request.method == "POST":
         company_name = request.form.get("company_name")
         contact_name = request.form.get("contact_name")
-        email = request.form.get("email")
+        email = normalize_email(request.form.get("email"))
         phone = request.form.get("phone")
         location = request.form.get("location")
         website = request.form.get("website")
@@ -210,77 +363,76 @@ def register_employer():
             flash("Email already registered.", "danger")
             return redirect(url_for("register_employer"))
 
-        employer_id = generate_id("EMP", Employer)
         employer = Employer(
-            id=employer_id,
             company_name=company_name,
             contact_name=contact_name,
             email=email,
             phone=phone,
             location=location,
             website=website,
-            password_hash=generate_password_hash(password)
+            password_hash=generate_password_hash(password, method=PASSWORD_HASH_METHOD)
         )
         db.session.add(employer)
         db.session.commit()
         flash("Employer registered. You can now log in.", "success")
         return redirect(url_for("login"))
 
-    return render_template("register_employer.html")
+    return render_static_page("register_employer.html")
 
 
 @app.route("/register/faculty", methods=["GET", "POST"])
 def register_faculty():
     if request.method == "POST":
         name = request.form.get("name")
-        email = request.form.get("email")
+        email = normalize_email(request.form.get("email"))
         department = request.form.get("department")
         password = request.form.get("password")
 
-        # One coordinator per department
-        existing_dept = Faculty.query.filter_by(department=department).first()
-        if existing_dept:
+        # One coordinator per department, one account per email; check both
+        # in a single query, preferring the department match when both hit.
+        existing = (
+            Faculty.query
+            .filter(or_(Faculty.department == department, Faculty.email == email))
+            .order_by(case((Faculty.department == department, 0), else_=1))
+            .first()
+        )
+        if existing and existing.department == department:
             flash("A co-op coordinator already exists for this department.", "danger")
             return redirect(url_for("register_faculty"))
 
-        if Faculty.query.filter_by(email=email).first():
+        if existing:
             flash("Email already registered.", "danger")
             return redirect(url_for("register_faculty"))
 
-        faculty_id = generate_id("FAC", Faculty)
         faculty = Faculty(
-            id=faculty_id,
             name=name,
             email=email,
             department=department,
-            password_hash=generate_password_hash(password)
+            password_hash=generate_password_hash(password, method=PASSWORD_HASH_METHOD)
         )
         db.session.add(faculty)
         db.session.commit()
         flash("Faculty registered. You can now log in.", "success")
         return redirect(url_for("login"))
 
-    return render_template("register_faculty.html")
+    return render_static_page("register_faculty.html")
 
 
 # ---------- Student Routes ----------
 
 @app.route("/student/dashboard")
-def student_dashboard():
-    role, user = current_user()
-    if role != "student":
-        return redirect(url_for("login"))
-
-    applications = Application.query.filter_by(student_id=user.id).all()
+@require_role("student")
+def student_dashboard(user):
+    applications = load_student_applications(user.id)
     total_apps = len(applications)
-    pending_apps = len([a for a in applications if a.status == "Pending"])
+    pending_apps = sum(a.status == "Pending" for a in applications)
 
     # Simple eligibility summary: if any application is eligible
-    eligibilities = CoopEligibility.query.join(Application).filter(
+    eligible = db.session.scalar(select(exists().where(and_(
         Application.student_id == user.id,
-        CoopEligibility.is_eligible == True  # noqa: E712
-    ).all()
-    eligible_flag = "Yes" if eligibilities else "No"
+        Application.is_eligible,
+    ))))
+    eligible_flag = "Yes" if eligible else "No"
 
     return render_template(
         "student_dashboard.html",
@@ -293,18 +445,14 @@ def student_dashboard():
 
 
 @app.route("/student/search")
-def student_search():
-    role, user = current_user()
-    if role != "student":
-        return redirect(url_for("login"))
-
+@require_role("student")
+def student_search(user):
     q = request.args.get("q", "")
     employer_name = request.args.get("employer", "")
     location = request.args.get("location", "")
 
-    query = JobPosition.query.filter(
-        (JobPosition.status == "Open") | (JobPosition.status.is_(None))
-    )
+    # Plain equality so SQLite can walk the partial ix_pos_open index
+    query = JobPosition.query.filter(JobPosition.status == "Open")
     if q:
         query = query.filter(JobPosition.title.ilike(f"%{q}%"))
     if employer_name:
@@ -312,15 +460,24 @@ def student_search():
     if location:
         query = query.filter(JobPosition.location.ilike(f"%{location}%"))
 
-    positions = query.order_by(JobPosition.created_at.desc()).all()
+    positions = (
+        query.options(selectinload(JobPosition.employer))
+        .order_by(JobPosition.created_at.desc(), JobPosition.id.desc())
+        .all()
+    )
     return render_template("search_jobs.html", positions=positions, q=q,
                            employer_name=employer_name, location=location)
 
 
-@app.route("/position/<position_id>")
+@app.route("/position/<int:position_id>")
 def job_details(position_id):
     role, user = current_user()
-    position = JobPosition.query.get_or_404(position_id)
+    position = (
+        JobPosition.query
+        .options(undefer(JobPosition.description))
+        .filter_by(id=position_id)
+        .first_or_404()
+    )
 
     existing_app = None
     if role == "student" and user:
@@ -329,43 +486,37 @@ def job_details(position_id):
     return render_template("job_details.html", position=position, existing_app=existing_app)
 
 
-@app.route("/apply/<position_id>", methods=["POST"])
-def apply_to_position(position_id):
-    role, user = current_user()
-    if role != "student":
-        return redirect(url_for("login"))
-
+@app.route("/apply/<int:position_id>", methods=["POST"])
+@require_role("student")
+def apply_to_position(position_id, user):
     position = JobPosition.query.get_or_404(position_id)
-    existing = Application.query.filter_by(student_id=user.id, position_id=position.id).first()
-    if existing:
+    # One statement instead of SELECT-then-INSERT: the unique index
+    # ix_app_student_pos turns a second apply (or a double submit) into a no-op
+    new_id = db.session.scalar(
+        sqlite_insert(Application)
+        .values(student_id=user.id, position_id=position.id, status="Pending")
+        .on_conflict_do_nothing(index_elements=["student_id", "position_id"])
+        .returning(Application.id)
+    )
+    if new_id is None:
         flash("You already applied to this position.", "info")
         return redirect(url_for("job_details", position_id=position_id))
 
-    app_obj = Application(student_id=user.id, position_id=position.id, status="Pending")
-    db.session.add(app_obj)
     db.session.commit()
     flash("Application submitted.", "success")
     return redirect(url_for("student_applications"))
 
 
 @app.route("/student/applications")
-def student_applications():
-    role, user = current_user()
-    if role != "student":
-        return redirect(url_for("login"))
-
-    applications = Application.query.filter_by(student_id=user.id).order_by(
-        Application.applied_at.desc()
-    ).all()
+@require_role("student")
+def student_applications(user):
+    applications = load_student_applications(user.id)
     return render_template("student_applications.html", applications=applications)
 
 
 @app.route("/student/application/<int:app_id>/withdraw", methods=["POST"])
-def withdraw_application(app_id):
-    role, user = current_user()
-    if role != "student":
-        return redirect(url_for("login"))
-
+@require_role("student")
+def withdraw_application(app_id, user):
     app_obj = Application.query.get_or_404(app_id)
     if app_obj.student_id != user.id:
         return redirect(url_for("student_applications"))
@@ -377,17 +528,14 @@ def withdraw_application(app_id):
 
 
 @app.route("/student/application/<int:app_id>/interest", methods=["POST"])
-def indicate_interest(app_id):
+@require_role("student")
+def indicate_interest(app_id, user):
     """Eligible student indicates they want co-op credit."""
-    role, user = current_user()
-    if role != "student":
-        return redirect(url_for("login"))
-
     app_obj = Application.query.get_or_404(app_id)
     if app_obj.student_id != user.id:
         return redirect(url_for("student_applications"))
 
-    if not app_obj.eligibility or not app_obj.eligibility.is_eligible:
+    if not app_obj.is_eligible:
         flash("You are not marked as eligible for co-op for this position.", "danger")
         return redirect(url_for("student_applications"))
 
@@ -397,12 +545,10 @@ def indicate_interest(app_id):
             application_id=app_obj.id,
             student_id=user.id,
             position_id=app_obj.position_id,
-            eligibility_id=app_obj.eligibility.id,
         )
         db.session.add(coop_record)
 
     coop_record.student_interested = True
-    coop_record.updated_at = datetime.utcnow()
     db.session.commit()
 
     flash("Your interest in co-op credit has been recorded.", "success")
@@ -410,26 +556,24 @@ def indicate_interest(app_id):
 
 
 @app.route("/student/summary/<int:app_id>", methods=["GET", "POST"])
-def submit_summary(app_id):
-    role, user = current_user()
-    if role != "student":
-        return redirect(url_for("login"))
-
+@require_role("student")
+def submit_summary(app_id, user):
     application = Application.query.get_or_404(app_id)
     if application.student_id != user.id:
         return redirect(url_for("student_applications"))
 
+    # A new record is only added to the session here; it is written by the
+    # single commit below (POST) or when the form is first opened (GET).
     coop_record = application.coop_record
-    if not coop_record:
+    is_new = coop_record is None
+    if is_new:
         coop_record = CoopRecord(
             application_id=application.id,
             student_id=user.id,
             position_id=application.position_id,
-            eligibility_id=getattr(application.eligibility, "id", None),
             student_interested=True,
         )
         db.session.add(coop_record)
-        db.session.commit()
 
     if request.method == "POST":
         summary = request.form.get("summary")
@@ -439,40 +583,47 @@ def submit_summary(app_id):
             coop_record.summary_status = "Submitted"
         else:
             coop_record.summary_status = "Draft"
-        coop_record.updated_at = datetime.utcnow()
         db.session.commit()
         flash("Summary saved.", "success")
         return redirect(url_for("student_applications"))
 
+    if is_new:
+        db.session.commit()
     return render_template("submit_summary.html", application=application, coop_record=coop_record)
 
 
 # ---------- Employer Routes ----------
 
 @app.route("/employer/dashboard")
-def employer_dashboard():
-    role, user = current_user()
-    if role != "employer":
-        return redirect(url_for("login"))
-
+@require_role("employer")
+def employer_dashboard(user):
     positions = JobPosition.query.filter_by(employer_id=user.id).all()
 
-    # Active postings: treat None or "Open" as active, not closed
-    active_count = len([
-        p for p in positions
-        if p.status in (None, "", "Open")
-    ])
-    total_apps = 0
-    selected_count = 0
-    pending_reviews = 0
-
-    for p in positions:
-        total_apps += len(p.applications)
-        for a in p.applications:
-            if a.status == "Selected":
-                selected_count += 1
-                if a.coop_record and a.coop_record.employer_approval == "Pending":
-                    pending_reviews += 1
+    # Active postings: status is a NOT NULL enum, so only "Open" counts
+    active_count = db.session.scalar(
+        select(func.count())
+        .select_from(JobPosition)
+        .where(JobPosition.employer_id == user.id, JobPosition.status == "Open")
+    )
+
+    # Applicant counters in one pass over applications and their co-op records
+    total_apps, selected_count, pending_reviews = db.session.execute(
+        select(
+            func.count(Application.id),
+            func.count(case((Application.status == "Selected", 1))),
+            func.count(case((
+                and_(
+                    Application.status == "Selected",
+                    CoopRecord.employer_approval == "Pending",
+                ),
+                1,
+            ))),
+        )
+        .select_from(JobPosition)
+        .join(Application, Application.position_id == JobPosition.id)
+        .outerjoin(CoopRecord, CoopRecord.application_id == Application.id)
+        .where(JobPosition.employer_id == user.id)
+    ).one()
 
     return render_template(
         "employer_dashboard.html",
@@ -486,52 +637,48 @@ def employer_dashboard():
 
 
 @app.route("/employer/post", methods=["POST"])
-def employer_post():
+@require_role("employer")
+def employer_post(user):
     """Create a new job posting (form at bottom of employer_dashboard)."""
-    role, user = current_user()
-    if role != "employer":
-        return redirect(url_for("login"))
-
     title = request.form.get("title")
     description = request.form.get("description")
     location = request.form.get("location")
     weeks = int(request.form.get("weeks") or 0)
     hours_per_week = int(request.form.get("hours_per_week") or 0)
-    total_hours = weeks * hours_per_week
-    majors_of_interest = request.form.get("majors_of_interest")
-    required_skills = request.form.get("required_skills")
-    preferred_skills = request.form.get("preferred_skills")
     salary_info = request.form.get("salary_info")
 
-    position_id = generate_id("POS", JobPosition)
     position = JobPosition(
-        id=position_id,
         employer_id=user.id,
         title=title,
         description=description,
         location=location,
         weeks=weeks,
         hours_per_week=hours_per_week,
-        total_hours=total_hours,
-        majors_of_interest=majors_of_interest,
-        required_skills=required_skills,
-        preferred_skills=preferred_skills,
         salary_info=salary_info,
         status="Open",
     )
     db.session.add(position)
+    position.set_skills(
+        major=request.form.get("majors_of_interest"),
+        required=request.form.get("required_skills"),
+        preferred=request.form.get("preferred_skills"),
+    )
     db.session.commit()
     flash("Job position created.", "success")
     return redirect(url_for("employer_dashboard"))
 
 
-@app.route("/employer/position/<position_id>/applicants")
-def employer_applicants(position_id):
-    role, user = current_user()
-    if role != "employer":
-        return redirect(url_for("login"))
-
-    position = JobPosition.query.get_or_404(position_id)
+@app.route("/employer/position/<int:position_id>/applicants")
+@require_role("employer")
+def employer_applicants(position_id, user):
+    position = (
+        JobPosition.query
+        .options(*debug_raiseload(
+            selectinload(JobPosition.applications).selectinload(Application.student),
+        ))
+        .filter_by(id=position_id)
+        .first_or_404()
+    )
     if position.employer_id != user.id:
         return redirect(url_for("employer_dashboard"))
 
@@ -539,34 +686,26 @@ def employer_applicants(position_id):
 
 
 @app.route("/employer/application/<int:app_id>/select", methods=["POST"])
-def employer_select(app_id):
-    role, user = current_user()
-    if role != "employer":
-        return redirect(url_for("login"))
-
-    application = Application.query.get_or_404(app_id)
+@require_role("employer")
+def employer_select(app_id, user):
+    # Student, position and employer are all needed below; fetch them together
+    application = db.session.scalars(
+        select(Application)
+        .options(
+            joinedload(Application.student),
+            joinedload(Application.position).joinedload(JobPosition.employer),
+        )
+        .where(Application.id == app_id)
+    ).first() or abort(404)
     position = application.position
     student = application.student
 
-    application.status = "Selected"
-    position.status = "Pending"
-
-    selection = Selection(application_id=application.id)
-    db.session.add(selection)
-
     is_eligible, gpa_ok, weeks_ok, hours_ok, semesters_ok = check_eligibility(student, position)
-    eligibility = CoopEligibility(
-        application_id=application.id,
-        is_eligible=is_eligible,
-        gpa_ok=gpa_ok,
-        weeks_ok=weeks_ok,
-        hours_ok=hours_ok,
-        semesters_ok=semesters_ok,
-    )
-    db.session.add(eligibility)
-    db.session.commit()
 
-    # Email notification for eligible students
+    # Email notification for eligible students. Built (and the redirect
+    # target read) before the commit, which expires every loaded attribute
+    # and would otherwise re-SELECT the student and position.
+    email = None
     if is_eligible:
         subject = "CECS Co-op Portal: You have been selected and are eligible"
         body = (
@@ -576,36 +715,45 @@ def employer_select(app_id):
             f"If you are interested in receiving co-op credit, please log in to the portal and indicate your interest.\n\n"
             f"- CECS Co-op Portal"
         )
-        send_email(student.email, subject, body)
+        email = (student.email, subject, body)
+    position_id = position.id
+
+    # Selection and eligibility result are written to the application row
+    # in one UPDATE; timestamps come from the database clock
+    application.status = "Selected"
+    application.selected_at = db.func.now()
+    application.eligibility_flags = Application.pack_eligibility(gpa_ok, weeks_ok, hours_ok, semesters_ok)
+    application.checked_at = db.func.now()
+    position.status = "Pending"
+    db.session.commit()
+
+    if email:
+        queue_email(*email)
 
     flash(f"Candidate selected. Eligibility result: {'Eligible' if is_eligible else 'Not eligible'}.", "info")
-    return redirect(url_for("employer_applicants", position_id=position.id))
+    return redirect(url_for("employer_applicants", position_id=position_id))
 
 
 @app.route("/employer/application/<int:app_id>/reject", methods=["POST"])
-def employer_reject(app_id):
-    role, user = current_user()
-    if role != "employer":
-        return redirect(url_for("login"))
-
+@require_role("employer")
+def employer_reject(app_id, user):
     application = Application.query.get_or_404(app_id)
+    position_id = application.position_id  # read before the commit expires the row
     application.status = "Rejected"
     db.session.commit()
     flash("Application rejected.", "info")
-    return redirect(url_for("employer_applicants", position_id=application.position_id))
+    return redirect(url_for("employer_applicants", position_id=position_id))
 
 
 @app.route("/employer/pending-reviews")
-def employer_pending_reviews():
+@require_role("employer")
+def employer_pending_reviews(user):
     """List co-op records where student has submitted summary but employer has not approved yet."""
-    role, user = current_user()
-    if role != "employer":
-        return redirect(url_for("login"))
-
     coop_records = (
         CoopRecord.query
         .join(Application)
         .join(JobPosition)
+        .options(selectinload(CoopRecord.student), selectinload(CoopRecord.position))
         .filter(
             JobPosition.employer_id == user.id,
             CoopRecord.summary_status == "Submitted",
@@ -617,21 +765,24 @@ def employer_pending_reviews():
 
 
 @app.route("/employer/coop/<int:coop_id>", methods=["GET", "POST"])
-def employer_review_summary(coop_id):
-    role, user = current_user()
-    if role != "employer":
-        return redirect(url_for("login"))
-
-    coop_record = CoopRecord.query.get_or_404(coop_id)
-    application = coop_record.application
-    position = application.position
+@require_role("employer")
+def employer_review_summary(coop_id, user):
+    coop_record = (
+        CoopRecord.query
+        .options(undefer(CoopRecord.summary_text))
+        .filter_by(id=coop_id)
+        .first_or_404()
+    )
+    position = coop_record.position
     if position.employer_id != user.id:
         return redirect(url_for("employer_dashboard"))
 
     if request.method == "POST":
         decision = request.form.get("approval")  # Approved / Rejected
+        if decision not in ("Approved", "Rejected"):
+            flash("Please choose Approve or Reject.", "danger")
+            return redirect(url_for("employer_review_summary", coop_id=coop_record.id))
         coop_record.employer_approval = decision
-        coop_record.updated_at = datetime.utcnow()
         db.session.commit()
         flash("Co-op summary review submitted.", "success")
         return redirect(url_for("employer_pending_reviews"))
@@ -642,28 +793,33 @@ def employer_review_summary(coop_id):
 # ---------- Faculty Routes ----------
 
 @app.route("/faculty/dashboard")
-def faculty_dashboard():
-    role, user = current_user()
-    if role != "faculty":
-        return redirect(url_for("login"))
-
+@require_role("faculty")
+def faculty_dashboard(user):
     # Only see co-op students in this faculty's department
     coop_records = (
         CoopRecord.query
         .join(Student)
         .filter(Student.department == user.department)
+        .options(
+            selectinload(CoopRecord.student),
+            selectinload(CoopRecord.position),
+        )
         .all()
     )
 
-    total_students = len({cr.student_id for cr in coop_records})
-    pending_summaries = len([
-        cr for cr in coop_records
-        if cr.summary_status == "Submitted" and not cr.faculty_grade
-    ])
-    graded = len([cr for cr in coop_records if cr.faculty_grade])
-    awaiting_approval = len([
-        cr for cr in coop_records if cr.employer_approval == "Pending"
-    ])
+    has_grade = CoopRecord.faculty_grade.is_not(None)
+    total_students, pending_summaries, graded, awaiting_approval = db.session.execute(
+        select(
+            func.count(distinct(CoopRecord.student_id)),
+            func.count(case((
+                and_(CoopRecord.summary_status == "Submitted", ~has_grade), 1
+            ))),
+            func.count(case((has_grade, 1))),
+            func.count(case((CoopRecord.employer_approval == "Pending", 1))),
+        )
+        .join(Student, Student.id == CoopRecord.student_id)
+        .where(Student.department == user.department)
+    ).one()
 
     return render_template(
         "faculty_students.html",
@@ -677,18 +833,22 @@ def faculty_dashboard():
 
 
 @app.route("/faculty/grade/<int:coop_id>", methods=["GET", "POST"])
-def faculty_grade(coop_id):
-    role, user = current_user()
-    if role != "faculty":
-        return redirect(url_for("login"))
-
-    coop_record = CoopRecord.query.get_or_404(coop_id)
+@require_role("faculty")
+def faculty_grade(coop_id, user):
+    coop_record = (
+        CoopRecord.query
+        .options(undefer(CoopRecord.summary_text))
+        .filter_by(id=coop_id)
+        .first_or_404()
+    )
 
     if request.method == "POST":
         grade = request.form.get("grade")
+        if grade not in GRADES:
+            flash("Please choose a grade.", "danger")
+            return redirect(url_for("faculty_grade", coop_id=coop_record.id))
         coop_record.faculty_grade = grade
         coop_record.faculty_id = user.id
-        coop_record.updated_at = datetime.utcnow()
         db.session.commit()
         flash("Grade saved.", "success")
         return redirect(url_for("faculty_dashboard"))
@@ -1,145 +1,420 @@
 # models.py
+from flask import g
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import declared_attr, validates
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime
+import os
 
 db = SQLAlchemy()
 
-
-def generate_id(prefix: str, model) -> str:
+# Development loader checks, on under `flask --debug` (FLASK_DEBUG=1). Read
+# once here: one-to-many collections use it through COLLECTION_LAZY, and
+# app.debug_raiseload() through the flag itself, so they always agree.
+RAISE_ON_LAZY_LOAD = os.environ.get("FLASK_DEBUG") == "1"
+
+# Loader for one-to-many collections. With the checks on, a collection that
+# was not eager-loaded raises instead of silently issuing a query per parent.
+COLLECTION_LAZY = "raise" if RAISE_ON_LAZY_LOAD else "select"
+
+# Surrogate key type: BIGINT, but plain INTEGER on SQLite so the column
+# aliases the rowid and autoincrements.
+BigId = db.BigInteger().with_variant(db.Integer, "sqlite")
+
+# Status vocabularies: native ENUM types on Postgres, CHECK-constrained
+# VARCHAR on SQLite. validate_strings rejects a typo before it reaches the DB.
+PositionStatus = db.Enum(
+    "Open", "Pending", "Closed",
+    name="position_status", create_constraint=True, validate_strings=True,
+)
+AppStatus = db.Enum(
+    "Pending", "Selected", "Rejected", "Withdrawn",
+    name="application_status", create_constraint=True, validate_strings=True,
+)
+SummaryStatus = db.Enum(
+    "Draft", "Submitted",
+    name="summary_status", create_constraint=True, validate_strings=True,
+)
+ApprovalStatus = db.Enum(
+    "Pending", "Approved", "Rejected",
+    name="approval_status", create_constraint=True, validate_strings=True,
+)
+
+
+def display_id_column():
+    """Fixed-width PRE-YYYY-XXXX column; the CHECK catches generator drift."""
+    return db.Column(
+        db.CHAR(13),
+        db.CheckConstraint("length(display_id) = 13"),
+        unique=True,
+        index=True,
+    )
+
+
+class IdCounter(db.Model):
+    """Last number handed out per (prefix, year), e.g. ("STU", 2025) -> 17."""
+    __tablename__ = "id_counters"
+
+    prefix = db.Column(db.String(3), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    last = db.Column(db.Integer, nullable=False, default=0)
+
+
+def generate_id(prefix: str, connection=None) -> str:
     """
-    Generate IDs like STU-2025-0001 based on current year and count.
+    Generate IDs like STU-2025-0001 based on current year and a counter.
+    The counter is bumped with one upsert (... RETURNING last), so there is
+    no table scan and two concurrent inserts can never get the same number.
+    Pass `connection` when calling from inside a flush. The number is four
+    digits (display_id is CHAR(13)), so each prefix can issue 9999 IDs per
+    year; past that this raises instead of failing the column CHECK.
     """
     year = datetime.now().year
-    count = model.query.count() + 1
+    stmt = (
+        sqlite_insert(IdCounter)
+        .values(prefix=prefix, year=year, last=1)
+        .on_conflict_do_update(
+            index_elements=["prefix", "year"],
+            set_={"last": IdCounter.last + 1},
+        )
+        .returning(IdCounter.last)
+    )
+    count = (connection or db.session).execute(stmt).scalar_one()
+    if count > 9999:
+        raise RuntimeError(
+            f"{prefix} display IDs for {year} are exhausted (9999 per year); "
+            "widen display_id before issuing more"
+        )
     return f"{prefix}-{year}-{count:04d}"
 
 
-class Student(db.Model):
+def normalize_email(value: str) -> str:
+    """Canonical stored form of an email: trimmed and lowercased."""
+    return (value or "").strip().lower()
+
+
+class AccountMixin:
+    """Shared columns and behaviour of the Student, Employer and Faculty models."""
+
+    email = db.Column(db.String(120), unique=True, index=True, nullable=False)
+
+    @declared_attr
+    def password_hash(cls):
+        # Only read at login (which undefers it); scrypt hashes are ~162 chars
+        return db.deferred(db.Column(db.String(255), nullable=False))
+
+    @validates("email")
+    def _normalize_email(self, key, value):
+        # Stored lowercase, so lookups hit the plain unique index directly
+        return normalize_email(value)
+
+    @classmethod
+    def get_cached(cls, id_):
+        """
+        Return the row with primary key `id_` (or None). Repeat calls within
+        a request are a dict hit on `g`, skipping even the session's
+        identity-map lookup and autoflush check.
+        """
+        cache = g.setdefault("_entity_cache", {})
+        key = (cls.__name__, id_)
+        if key not in cache:
+            cache[key] = db.session.get(cls, id_)
+        return cache[key]
+
+
+class Student(AccountMixin, db.Model):
     __tablename__ = "students"
+    id_prefix = "STU"
 
-    id = db.Column(db.String(20), primary_key=True)  # STU-YYYY-XXXX
+    id = db.Column(BigId, primary_key=True, autoincrement=True)
+    display_id = display_id_column()  # STU-YYYY-XXXX
     name = db.Column(db.String(100), nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
     phone = db.Column(db.String(20))
-    department = db.Column(db.String(100))
+    department = db.Column(db.String(100), index=True)
     major = db.Column(db.String(100))
     credits_completed = db.Column(db.Integer, default=0)
-    gpa = db.Column(db.Float, default=0.0)
+    # Fixed-point GPA in hundredths (3.47 -> 347); exposed as a float via `gpa`
+    gpa_x100 = db.Column("gpa", db.SmallInteger, default=0, nullable=False)
     start_semester = db.Column(db.String(20))  # e.g., "Fall"
     start_year = db.Column(db.Integer)
     is_transfer = db.Column(db.Boolean, default=False)
-    password_hash = db.Column(db.String(255), nullable=False)
-    resume_filename = db.Column(db.String(255))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    resume_filename = db.deferred(db.Column(db.String(255)))
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    applications = db.relationship("Application", back_populates="student", lazy=COLLECTION_LAZY)
+    coop_records = db.relationship("CoopRecord", back_populates="student", lazy=COLLECTION_LAZY)
+
+    @hybrid_property
+    def gpa(self):
+        if self.gpa_x100 is None:  # transient row, column default not applied yet
+            return None
+        return self.gpa_x100 / 100.0
 
-    applications = db.relationship("Application", backref="student", lazy=True)
-    coop_records = db.relationship("CoopRecord", backref="student", lazy=True)
+    @gpa.setter
+    def gpa(self, value):
+        self.gpa_x100 = round(value * 100)
 
+    @gpa.expression
+    def gpa(cls):
+        return cls.gpa_x100 / 100.0
 
-class Employer(db.Model):
+
+class Employer(AccountMixin, db.Model):
     __tablename__ = "employers"
+    id_prefix = "EMP"
 
-    id = db.Column(db.String(20), primary_key=True)  # EMP-YYYY-XXXX
+    id = db.Column(BigId, primary_key=True, autoincrement=True)
+    display_id = display_id_column()  # EMP-YYYY-XXXX
     company_name = db.Column(db.String(150), nullable=False)
     contact_name = db.Column(db.String(100))
-    email = db.Column(db.String(120), unique=True, nullable=False)
     phone = db.Column(db.String(20))
     location = db.Column(db.String(150))
     website = db.Column(db.String(200))
-    password_hash = db.Column(db.String(255), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
 
-    positions = db.relationship("JobPosition", backref="employer", lazy=True)
+    positions = db.relationship("JobPosition", back_populates="employer", lazy=COLLECTION_LAZY)
 
 
-class Faculty(db.Model):
+class Faculty(AccountMixin, db.Model):
     __tablename__ = "faculty"
+    id_prefix = "FAC"
 
-    id = db.Column(db.String(20), primary_key=True)  # FAC-YYYY-XXXX
+    id = db.Column(BigId, primary_key=True, autoincrement=True)
+    display_id = display_id_column()  # FAC-YYYY-XXXX
     name = db.Column(db.String(100), nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
     department = db.Column(db.String(100))
-    password_hash = db.Column(db.String(255), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
 
-    coop_records = db.relationship("CoopRecord", backref="faculty", lazy=True)
+    coop_records = db.relationship("CoopRecord", back_populates="faculty", lazy=COLLECTION_LAZY)
 
 
 class JobPosition(db.Model):
     __tablename__ = "job_positions"
-
-    id = db.Column(db.String(20), primary_key=True)  # POS-YYYY-XXXX
-    employer_id = db.Column(db.String(20), db.ForeignKey("employers.id"), nullable=False)
+    __table_args__ = (
+        # Student search: open postings, newest first. Only open rows are
+        # indexed, so it stays small as closed postings accumulate.
+        db.Index(
+            "ix_pos_open", "created_at",
+            postgresql_where=db.text("status = 'Open'"),
+            sqlite_where=db.text("status = 'Open'"),
+        ),
+    )
+    id_prefix = "POS"
+
+    id = db.Column(BigId, primary_key=True, autoincrement=True)
+    display_id = display_id_column()  # POS-YYYY-XXXX
+    employer_id = db.Column(BigId, db.ForeignKey("employers.id"), nullable=False, index=True)
 
     title = db.Column(db.String(150), nullable=False)
-    description = db.Column(db.Text)
+    description = db.deferred(db.Column(db.Text))  # list pages never show it
     location = db.Column(db.String(150))
     weeks = db.Column(db.Integer, default=0)
     hours_per_week = db.Column(db.Integer, default=0)
-    total_hours = db.Column(db.Integer, default=0)
-    majors_of_interest = db.Column(db.String(255))
-    required_skills = db.Column(db.String(255))
-    preferred_skills = db.Column(db.String(255))
+    total_hours = db.Column(db.Integer, db.Computed("weeks * hours_per_week"))
     salary_info = db.Column(db.String(100))
-    status = db.Column(db.String(20), default="Open")  # Open / Pending / Closed
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(PositionStatus, default="Open", nullable=False, index=True)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())  # indexed by ix_pos_open
+
+    employer = db.relationship("Employer", back_populates="positions")
+    applications = db.relationship("Application", back_populates="position", lazy=COLLECTION_LAZY)
+    coop_records = db.relationship("CoopRecord", back_populates="position", lazy=COLLECTION_LAZY)
+    skill_links = db.relationship(
+        "PositionSkill", back_populates="position",
+        cascade="all, delete-orphan", lazy=COLLECTION_LAZY,
+    )
+
+    def set_skills(self, **texts):
+        """
+        Replace this position's skills from comma-separated form values,
+        keyed by kind: set_skills(major="CS, CE", required="Python").
+        Existing Skill rows are reused, found with a single SELECT.
+        For a saved position, skill_links must already be loaded.
+        """
+        by_kind = {
+            kind: list(dict.fromkeys(n.strip() for n in (text or "").split(",") if n.strip()))
+            for kind, text in texts.items()
+        }
+        names = {n for kind_names in by_kind.values() for n in kind_names}
+        skills = {}
+        if names:
+            with db.session.no_autoflush:
+                skills = {
+                    s.name: s
+                    for s in db.session.scalars(db.select(Skill).where(Skill.name.in_(names)))
+                }
+        for name in names - skills.keys():
+            skills[name] = Skill(name=name)
+
+        self.skill_links = [
+            PositionSkill(skill=skills[name], kind=kind)
+            for kind, kind_names in by_kind.items()
+            for name in kind_names
+        ]
+
+
+class Skill(db.Model):
+    __tablename__ = "skills"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+
+
+class PositionSkill(db.Model):
+    """A skill or major tagged on a position; kind is major / required / preferred."""
+    __tablename__ = "position_skills"
+    __table_args__ = (
+        # "positions that need skill X" is an index lookup instead of LIKE '%X%'
+        db.Index("ix_position_skills_skill_kind", "skill_id", "kind"),
+    )
 
-    applications = db.relationship("Application", backref="position", lazy=True)
+    position_id = db.Column(BigId, db.ForeignKey("job_positions.id"), primary_key=True)
+    skill_id = db.Column(db.Integer, db.ForeignKey("skills.id"), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)
+
+    position = db.relationship("JobPosition", back_populates="skill_links")
+    skill = db.relationship("Skill", lazy="selectin")
+
+
+# Application.eligibility_flags bits; a student is eligible only when all are set
+GPA_OK = 1
+WEEKS_OK = 2
+HOURS_OK = 4
+SEMESTERS_OK = 8
+ALL_OK = GPA_OK | WEEKS_OK | HOURS_OK | SEMESTERS_OK
 
 
 class Application(db.Model):
     __tablename__ = "applications"
+    __table_args__ = (
+        # Also serves lookups by student_id alone (leftmost column)
+        db.Index("ix_app_student_pos", "student_id", "position_id", unique=True),
+        # "applications for student/position X with status Y"; on Postgres
+        # applied_at is carried in the index so the heap is never visited
+        db.Index("ix_app_student_status", "student_id", "status", postgresql_include=["applied_at"]),
+        db.Index("ix_app_position_status", "position_id", "status", postgresql_include=["applied_at"]),
+        # Applications accumulate year over year; date-range reports and
+        # archiving old cycles read only the matching slice of this index
+        db.Index("ix_app_applied_at", "applied_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.String(20), db.ForeignKey("students.id"), nullable=False)
-    position_id = db.Column(db.String(20), db.ForeignKey("job_positions.id"), nullable=False)
+    student_id = db.Column(BigId, db.ForeignKey("students.id"), nullable=False)
+    position_id = db.Column(BigId, db.ForeignKey("job_positions.id"), nullable=False)
 
-    status = db.Column(db.String(20), default="Pending")  # Pending / Selected / Rejected / Withdrawn
-    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(AppStatus, default="Pending")
+    applied_at = db.Column(db.DateTime, server_default=db.func.now())
 
-    selection = db.relationship("Selection", backref="application", uselist=False)
-    eligibility = db.relationship("CoopEligibility", backref="application", uselist=False)
-    coop_record = db.relationship("CoopRecord", backref="application", uselist=False)
+    # Set when the employer selects the student (formerly the 1:1
+    # selections / coop_eligibility tables, now read without a join)
+    selected_at = db.Column(db.DateTime)
+    offer_letter_filename = db.deferred(db.Column(db.String(255)))
+    eligibility_flags = db.Column(db.SmallInteger)  # GPA_OK | WEEKS_OK | ...; NULL until checked
+    checked_at = db.Column(db.DateTime)
 
+    # Plain lazy loads: a single-row page gets these from the identity map
+    # or with one SELECT. List routes add selectinload() per query.
+    student = db.relationship("Student", back_populates="applications")
+    position = db.relationship("JobPosition", back_populates="applications")
+    coop_record = db.relationship("CoopRecord", back_populates="application", uselist=False)
 
-class Selection(db.Model):
-    __tablename__ = "selections"
+    @staticmethod
+    def pack_eligibility(gpa_ok: bool, weeks_ok: bool, hours_ok: bool, semesters_ok: bool) -> int:
+        """Combine the individual checks into an eligibility_flags value."""
+        return (
+            (GPA_OK if gpa_ok else 0)
+            | (WEEKS_OK if weeks_ok else 0)
+            | (HOURS_OK if hours_ok else 0)
+            | (SEMESTERS_OK if semesters_ok else 0)
+        )
 
-    id = db.Column(db.Integer, primary_key=True)
-    application_id = db.Column(db.Integer, db.ForeignKey("applications.id"), nullable=False)
-    selected_at = db.Column(db.DateTime, default=datetime.utcnow)
-    offer_letter_filename = db.Column(db.String(255))
+    @property
+    def eligibility_checked(self) -> bool:
+        return self.eligibility_flags is not None
 
+    def _has(self, bit: int) -> bool:
+        return bool((self.eligibility_flags or 0) & bit)
 
-class CoopEligibility(db.Model):
-    __tablename__ = "coop_eligibility"
+    @hybrid_property
+    def gpa_ok(self):
+        return self._has(GPA_OK)
 
-    id = db.Column(db.Integer, primary_key=True)
-    application_id = db.Column(db.Integer, db.ForeignKey("applications.id"), nullable=False)
+    @gpa_ok.expression
+    def gpa_ok(cls):
+        return cls.eligibility_flags.op("&")(GPA_OK) != 0
+
+    @hybrid_property
+    def weeks_ok(self):
+        return self._has(WEEKS_OK)
+
+    @weeks_ok.expression
+    def weeks_ok(cls):
+        return cls.eligibility_flags.op("&")(WEEKS_OK) != 0
+
+    @hybrid_property
+    def hours_ok(self):
+        return self._has(HOURS_OK)
+
+    @hours_ok.expression
+    def hours_ok(cls):
+        return cls.eligibility_flags.op("&")(HOURS_OK) != 0
 
-    is_eligible = db.Column(db.Boolean, default=False)
-    gpa_ok = db.Column(db.Boolean, default=False)
-    weeks_ok = db.Column(db.Boolean, default=False)
-    hours_ok = db.Column(db.Boolean, default=False)
-    semesters_ok = db.Column(db.Boolean, default=False)
-    checked_at = db.Column(db.DateTime, default=datetime.utcnow)
+    @hybrid_property
+    def semesters_ok(self):
+        return self._has(SEMESTERS_OK)
+
+    @semesters_ok.expression
+    def semesters_ok(cls):
+        return cls.eligibility_flags.op("&")(SEMESTERS_OK) != 0
+
+    @hybrid_property
+    def is_eligible(self):
+        # Works on rows and in queries: WHERE eligibility_flags = ALL_OK
+        return self.eligibility_flags == ALL_OK
+
+
+GRADES = ("A", "B", "C", "D", "E")
 
 
 class CoopRecord(db.Model):
     __tablename__ = "coop_records"
+    __table_args__ = (
+        db.Index("ix_coop_faculty_status", "faculty_id", "summary_status"),
+        db.CheckConstraint(
+            "faculty_grade IN (%s)" % ", ".join(f"'{g}'" for g in GRADES),
+            name="ck_coop_faculty_grade",
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    application_id = db.Column(db.Integer, db.ForeignKey("applications.id"), nullable=False)
-    student_id = db.Column(db.String(20), db.ForeignKey("students.id"), nullable=False)
-    position_id = db.Column(db.String(20), db.ForeignKey("job_positions.id"), nullable=False)
+    application_id = db.Column(db.Integer, db.ForeignKey("applications.id"), nullable=False, index=True)
+    student_id = db.Column(BigId, db.ForeignKey("students.id"), nullable=False, index=True)
+    position_id = db.Column(BigId, db.ForeignKey("job_positions.id"), nullable=False)
 
-    eligibility_id = db.Column(db.Integer, db.ForeignKey("coop_eligibility.id"))
-    faculty_id = db.Column(db.String(20), db.ForeignKey("faculty.id"))
+    faculty_id = db.Column(BigId, db.ForeignKey("faculty.id"))
 
     student_interested = db.Column(db.Boolean, default=False)
-    summary_text = db.Column(db.Text)
-    summary_status = db.Column(db.String(20), default="Draft")  # Draft / Submitted
-    employer_approval = db.Column(db.String(20), default="Pending")  # Pending / Approved / Rejected
-    faculty_grade = db.Column(db.String(2))  # AE
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    summary_text = db.deferred(db.Column(db.Text))  # loaded on the review/grade pages
+    summary_status = db.Column(SummaryStatus, default="Draft", index=True)
+    employer_approval = db.Column(ApprovalStatus, default="Pending", index=True)
+    faculty_grade = db.Column(db.CHAR(1))  # one of GRADES, NULL until graded
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+
+    application = db.relationship("Application", back_populates="coop_record")
+    student = db.relationship("Student", back_populates="coop_records")
+    position = db.relationship("JobPosition", back_populates="coop_records")
+    faculty = db.relationship("Faculty", back_populates="coop_records")
+
+
+# Models whose rows get a human-readable display_id
+DISPLAY_ID_MODELS = (Student, Employer, Faculty, JobPosition)
+
+
+@event.listens_for(db.Model, "before_insert", propagate=True)
+def _assign_display_id(_mapper, connection, target):
+    """Fill display_id (e.g. STU-2025-0001) for new rows of DISPLAY_ID_MODELS."""
+    prefix = getattr(target, "id_prefix", None)
+    if prefix and target.display_id is None:
+        target.display_id = generate_id(prefix, connection)
 